@@ -1,26 +1,116 @@
+import os
 import streamlit as st
 import pandas as pd
 import requests
-import plotly.express as px
+import snowflake.connector
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+import plotly.graph_objects as go
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-from statsmodels.tsa.arima.model import ARIMA
+import faiss
+import numpy as np
+from statsforecast.models import AutoARIMA
+
+load_dotenv()
 
 API_URL = "http://localhost:8000"  # replace with your API URL
+INLINE_DB = os.getenv("STREAMLIT_INLINE_DB") == "1"  # read trends straight from Snowflake instead of the API
+
+METRIC_MAP = {
+    "cases": "TOTAL_CASES",
+    "deaths": "TOTAL_DEATHS",
+    "cases_p_k": "CASES_PER_100K",
+    "deaths_p_k": "DEATHS_PER_100K"
+}
 
 st.set_page_config(page_title="COVID-19 Analytics", layout="wide")
 st.title("Analytical Features of California COVID-19 Dataset")
 
+# --------------------------
+# Shared HTTP session (keep-alive across Streamlit reruns)
+# --------------------------
+@st.cache_resource
+def get_session():
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return session
+
+SESSION = get_session()
+
 # --------------------------
 # Load counties
 # --------------------------
-@st.cache_data
+@st.cache_resource(ttl=3600)
 def get_counties():
-    res = requests.get(f"{API_URL}/demographics")
+    res = SESSION.get(f"{API_URL}/counties")
     if res.ok:
         return [c["COUNTY_NAME"] for c in res.json()]
     return []
 
+# --------------------------
+# Daily trend for one county (API or direct Snowflake read)
+# --------------------------
+@st.cache_resource
+def get_snowflake_connection():
+    return snowflake.connector.connect(
+        user=os.getenv("SNOWFLAKE_USER"),
+        password=os.getenv("SNOWFLAKE_PASSWORD"),
+        account=os.getenv("SNOWFLAKE_ACCOUNT"),
+        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
+        database=os.getenv("SNOWFLAKE_DATABASE"),
+        client_session_keep_alive=True
+    )
+
+def get_live_connection():
+    conn = get_snowflake_connection()
+    if conn.is_closed():
+        # The cached session dropped: forget it and open a new one
+        get_snowflake_connection.clear()
+        conn = get_snowflake_connection()
+    return conn
+
+def get_trend(county, metric):
+    metric_col = METRIC_MAP[metric]
+
+    if INLINE_DB:
+        # Same shape as /summary/trend, without the HTTP + JSON round trip
+        agg = "SUM" if metric in ["cases", "deaths"] else "AVG"
+        query = f"SELECT DATE AS PERIOD, {agg}({metric_col})::FLOAT AS {metric_col} " \
+                "FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_TREND_MV " \
+                f"WHERE AREA = %s AND DATE IS NOT NULL AND {metric_col} IS NOT NULL " \
+                "GROUP BY PERIOD ORDER BY PERIOD"
+        # Like the API branch, failures return an empty frame and show the "no data" warning
+        try:
+            cursor = get_live_connection().cursor()
+            try:
+                cursor.execute(query, (county,))
+                return cursor.fetch_pandas_all()
+            finally:
+                cursor.close()
+        except snowflake.connector.Error:
+            return pd.DataFrame()
+
+    res = SESSION.get(f"{API_URL}/summary/trend", params={
+        "county": county,
+        "metric": metric,
+        "interval": "day"
+    })
+    if res.ok and isinstance(res.json(), list):
+        return pd.DataFrame(res.json())
+    return pd.DataFrame()
+
+# --------------------------
+# Warm up AutoARIMA (numba JIT compiles on first fit)
+# --------------------------
+@st.cache_resource
+def warm_up_forecaster():
+    model = AutoARIMA(season_length=1)
+    model.fit(np.arange(10, dtype=float))
+    model.predict(h=1)
+    return True
+
+warm_up_forecaster()
+
 counties = get_counties()
 metrics = ["cases", "deaths", "cases_p_k", "deaths_p_k"]
 
@@ -51,54 +141,47 @@ if option == "Time Series Forecasting":
     if st.button("Run Forecast"):
         st.write(f"Forecasting {selected_metric} for {selected_county} for next {forecast_horizon} days...")
 
-        res = requests.get(f"{API_URL}/summary/trend", params={
-            "county": selected_county, 
-            "metric": selected_metric, 
-            "interval": "day"
-        })
-
-        if res.ok and res.json():
-            df = pd.DataFrame(res.json())
+        df = get_trend(selected_county, selected_metric)
 
-            metric_map = {
-                "cases": "TOTAL_CASES",
-                "deaths": "TOTAL_DEATHS",
-                "cases_p_k": "CASES_PER_100K",
-                "deaths_p_k": "DEATHS_PER_100K"
-            }
-            metric_col = metric_map[selected_metric]
+        if not df.empty:
+            metric_col = METRIC_MAP[selected_metric]
 
             if metric_col not in df.columns:
                 st.warning(f"No data available for {selected_metric} in {selected_county}.")
             else:
+                # Rows arrive typed, non-null and ordered by period; only the date needs parsing
                 df.rename(columns={'PERIOD': 'period', metric_col: 'value'}, inplace=True)
-                df['period'] = pd.to_datetime(df['period'], errors='coerce')
-                df['value'] = pd.to_numeric(df['value'], errors='coerce')
-                df = df.dropna(subset=['period', 'value']).set_index('period')
+                df['period'] = pd.to_datetime(df['period'])
+                df = df.set_index('period')
 
                 if df.empty:
                     st.warning(f"No valid {selected_metric} data available for {selected_county}.")
                 else:
                     try:
-                        model = ARIMA(df['value'], order=(1,1,1))
-                        model_fit = model.fit()
-                        forecast = model_fit.forecast(steps=forecast_horizon)
+                        # Short or flat series: skip the model fit, repeat the last observed value
+                        if len(df) < 20 or df['value'].std() < 1e-9:
+                            forecast = np.full(forecast_horizon, df['value'].iloc[-1], dtype=float)
+                            st.caption("Series is too short or constant for ARIMA; showing a naive (last value) forecast.")
+                        else:
+                            model = AutoARIMA(season_length=1)
+                            model.fit(df['value'].to_numpy())
+                            forecast = model.predict(h=forecast_horizon)['mean']
+                            st.caption("Forecast model: AutoARIMA")
                         forecast_dates = pd.date_range(df.index[-1] + pd.Timedelta(days=1), periods=forecast_horizon)
-                        forecast_df = pd.DataFrame({'value': forecast}, index=forecast_dates)
-
-                        df['type'] = 'Observed'
-                        forecast_df['type'] = 'Forecast'
-                        combined = pd.concat([df, forecast_df])
-
-                        fig = px.line(
-                            combined,
-                            x=combined.index,
-                            y='value',
-                            color='type',
-                            labels={'index': 'Date', 'value': selected_metric.capitalize(), 'type': 'Data Type'},
-                            title=f"{selected_metric.capitalize()} Forecast for {selected_county}"
+
+                        # Build traces directly from float32 arrays (smaller payload, no px introspection)
+                        fig = go.Figure([
+                            go.Scatter(x=df.index, y=df['value'].to_numpy(dtype='float32'),
+                                       mode='lines', name='Observed'),
+                            go.Scatter(x=forecast_dates, y=np.asarray(forecast, dtype='float32'),
+                                       mode='lines', name='Forecast', line=dict(color='red', dash='dash'))
+                        ])
+                        fig.update_layout(
+                            title=f"{selected_metric.capitalize()} Forecast for {selected_county}",
+                            xaxis_title='Date',
+                            yaxis_title=selected_metric.capitalize(),
+                            legend_title_text='Data Type'
                         )
-                        fig.update_traces(selector=dict(name='Forecast'), line=dict(color='red', dash='dash'))
                         st.plotly_chart(fig)
                     except Exception as e:
                         st.error(f"Forecast error: {e}")
@@ -138,33 +221,51 @@ elif option == "Clustering Counties":
         if not selected_features or len(selected_features) < 2:
             st.warning("Please select at least two features for clustering.")
         else:
-            res = requests.get(f"{API_URL}/cases-demographics-view", params={})
-            if res.ok and res.json():
+            # One precomputed row per county (averages over the whole period)
+            res = SESSION.get(f"{API_URL}/cluster-features", params={
+                "columns": ",".join(selected_features)
+            })
+            cluster_data = pd.DataFrame()
+            if res.ok and isinstance(res.json(), list):
                 cluster_data = pd.DataFrame(res.json()).set_index('AREA')
                 cluster_data = cluster_data[selected_features].dropna()
 
+            if cluster_data.empty:
+                st.warning("No data available for clustering.")
+            elif len(cluster_data) < num_clusters:
+                # faiss cannot train more centroids than there are points
+                st.warning(f"Only {len(cluster_data)} counties have data for the selected features; "
+                           f"choose at most {len(cluster_data)} clusters.")
+            else:
                 scaler = StandardScaler()
                 cluster_scaled = scaler.fit_transform(cluster_data)
 
-                kmeans = KMeans(n_clusters=num_clusters, random_state=42)
-                cluster_labels = kmeans.fit_predict(cluster_scaled)
-                cluster_data['Cluster'] = cluster_labels
+                # ~58 counties is far below faiss' default 39 points per centroid; allow small inputs quietly
+                x = np.ascontiguousarray(cluster_scaled, dtype='float32')
+                kmeans = faiss.Kmeans(d=x.shape[1], k=num_clusters, niter=20, seed=42, verbose=False,
+                                      min_points_per_centroid=1)
+                kmeans.train(x)
+                _, labels = kmeans.index.search(x, 1)
+                cluster_labels = labels.ravel()
 
                 x_feature, y_feature = selected_features[:2]
 
-                cluster_data_plot = cluster_data.copy()
-                cluster_data_plot[x_feature] = StandardScaler().fit_transform(cluster_data_plot[[x_feature]])
-                cluster_data_plot[y_feature] = StandardScaler().fit_transform(cluster_data_plot[[y_feature]])
-
-                fig = px.scatter(
-                    cluster_data_plot,
-                    x=x_feature,
-                    y=y_feature,
-                    color='Cluster',
-                    hover_name=cluster_data_plot.index,
+                # Plot the first two features in the already standardized clustering space,
+                # one WebGL trace per cluster
+                fig = go.Figure([
+                    go.Scattergl(
+                        x=x[cluster_labels == k, 0],
+                        y=x[cluster_labels == k, 1],
+                        mode='markers',
+                        name=f"Cluster {k}",
+                        hovertext=cluster_data.index[cluster_labels == k]
+                    )
+                    for k in range(num_clusters)
+                ])
+                fig.update_layout(
                     title=f"County Clusters ({num_clusters} groups)",
-                    size_max=15
+                    xaxis_title=x_feature,
+                    yaxis_title=y_feature,
+                    legend_title_text='Cluster'
                 )
                 st.plotly_chart(fig)
-            else:
-                st.warning("No data available for clustering.")
@@ -1,16 +1,27 @@
 import os
+import queue
+import threading
+from contextlib import contextmanager
 from fastapi import FastAPI, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse, Response
 from pymongo import MongoClient
 import snowflake.connector
+import pyarrow as pa
+import orjson
 from typing import Optional
 from dotenv import load_dotenv
-from functools import lru_cache
+from cachetools import TTLCache, cached
 from typing import Tuple
 
 
 load_dotenv()
 
 CACHE_SIZE = 128  # number of unique queries to cache
+CACHE_TTL = 24 * 60 * 60  # seconds; matches Snowflake's 24h result cache window
+POOL_SIZE = int(os.getenv("SNOWFLAKE_POOL_SIZE", 4))  # number of long-lived Snowflake connections
+POOL_TIMEOUT = int(os.getenv("SNOWFLAKE_POOL_TIMEOUT", 30))  # seconds a request waits for a free connection
+COMMENTS_CACHE_TTL = 60  # seconds; new dashboard comments show up in /comments within this window
+ARROW_STREAM = "application/vnd.apache.arrow.stream"  # media type of Arrow IPC stream responses
 
 # --- Snowflake connection setup ---
 def get_snowflake_connection():
@@ -19,45 +30,134 @@ def get_snowflake_connection():
         password=os.getenv("SNOWFLAKE_PASSWORD"),
         account=os.getenv("SNOWFLAKE_ACCOUNT"),
         warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
-        database=os.getenv("SNOWFLAKE_DATABASE")
+        database=os.getenv("SNOWFLAKE_DATABASE"),
+        client_session_keep_alive=True,
+        client_prefetch_threads=4,  # download result chunks in parallel
+        session_parameters={"USE_CACHED_RESULT": "TRUE"}
     )
     return conn
 
+# --- Snowflake connection pool ---
+# Connections are opened once at startup and reused, so requests pay query time
+# instead of a full TLS + auth handshake.
+_POOL = queue.Queue(maxsize=POOL_SIZE)
+
+def init_pool():
+    while not _POOL.full():
+        _POOL.put(get_snowflake_connection())
+
+def close_pool():
+    while not _POOL.empty():
+        _POOL.get_nowait().close()
+
+@contextmanager
+def pooled_connection():
+    conn = _POOL.get(timeout=POOL_TIMEOUT)  # raises queue.Empty when every connection stays busy
+    try:
+        if conn.is_closed():
+            conn = get_snowflake_connection()
+        yield conn
+    except Exception:
+        # A connection that failed mid-query may be unusable: close it so the
+        # next borrower opens a fresh one instead of reusing it
+        try:
+            conn.close()
+        except Exception:
+            pass
+        raise
+    finally:
+        _POOL.put(conn)
+
+# --- Arrow query helper (typed columnar result, returns None when there are no rows) ---
+def fetch_arrow(query: str, params: tuple = ()):
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetch_arrow_all()
+        finally:
+            cursor.close()
+
 # --- Query fetching helper function ---
+# Arrow keeps exact column types: integers with NULLs stay ints, dates stay dates, NULLs become None
 def fetch_query(query: str, params: tuple = ()):
-    conn = get_snowflake_connection()
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    columns = [col[0] for col in cursor.description]
-    cursor.close()
-    conn.close()
-    return [dict(zip(columns, row)) for row in rows]
+    table = fetch_arrow(query, params)
+    return table.to_pylist() if table is not None else []
+
+# --- Streaming query helper (NDJSON, one Arrow batch in memory at a time) ---
+def stream_query(query: str, params: tuple = ()):
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            # Records are encoded with orjson like the ORJSONResponse path, so values match (e.g. dates as YYYY-MM-DD)
+            for batch in cursor.fetch_arrow_batches():
+                if batch.num_rows:
+                    yield b"".join(orjson.dumps(row) + b"\n" for row in batch.to_pylist())
+        finally:
+            cursor.close()
+
+# --- Arrow IPC stream response ---
+def arrow_response(table: pa.Table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW_STREAM)
 
 # --- Cached query helper ---
-@lru_cache(maxsize=512)
-def fetch_query_cached(query: str, params: Tuple = ()) -> list:
-    conn = get_snowflake_connection()
-    cursor = conn.cursor()
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    columns = [col[0] for col in cursor.description]
-    cursor.close()
-    conn.close()
-    return [dict(zip(columns, row)) for row in rows]
+# Results are frozen to a tuple so callers can't mutate the cached entry.
+# Entries expire with the same 24h window as Snowflake's result cache.
+@cached(TTLCache(maxsize=512, ttl=CACHE_TTL), lock=threading.Lock())
+def fetch_query_cached(query: str, params: Tuple = ()) -> tuple:
+    return tuple(fetch_query(query, params))
+
+# Arrow tables are immutable, so they can be cached and shared as-is
+@cached(TTLCache(maxsize=512, ttl=CACHE_TTL), lock=threading.Lock())
+def fetch_arrow_cached(query: str, params: Tuple = ()):
+    return fetch_arrow(query, params)
+
+# --- NULL-guarded filter builder ---
+# Every predicate is always emitted as "(pred OR %s IS NULL)", so an endpoint produces
+# the same SQL text whichever filters are set; unset filters bind NULL and match all rows.
+def null_guarded(filters: dict):
+    clause = " AND ".join(f"({pred} OR %s IS NULL)" for pred in filters)
+    params = [param for value in filters.values() for param in (value or None, value or None)]
+    return clause, params
+
+# --- MongoDB client (thread-safe, pooled; shared by all requests) ---
+mongo_client = MongoClient("mongodb://localhost:27017", maxPoolSize=50)
+
+# --- Clustered MongoDB connection (commented) ---
+# MONGO_USER = os.getenv("MONGO_USER")
+# MONGO_PASSWORD = os.getenv("MONGO_PASSWORD")
+# MONGO_CLUSTER = os.getenv("MONGO_CLUSTER")  # e.g., cluster0.abcde.mongodb.net
+# mongo_client = MongoClient(f"mongodb+srv://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_CLUSTER}/?retryWrites=true&w=majority", maxPoolSize=50)
+
+
+app = FastAPI(default_response_class=ORJSONResponse)
+
 
+@app.exception_handler(queue.Empty)
+def pool_exhausted(request, exc):
+    return ORJSONResponse(status_code=503, content={"error": "All database connections are busy, try again later"})
 
-app = FastAPI()
+
+@app.on_event("startup")
+def startup():
+    init_pool()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    close_pool()
+    mongo_client.close()
 
 
 # --- Endpoint 1: demographics ---
 @app.get("/demographics")
 def get_demographics(county: str = Query(None)):
-    query = "SELECT * FROM CALIFORNIA_COVID_ANALYTICS.RAW.CA_COUNTY_DEMOGRAPHICS_2020 WHERE 1=1"
-    params = []
-    if county:
-        query += " AND COUNTY_NAME = %s"
-        params.append(county)
+    where, params = null_guarded({"COUNTY_NAME = %s": county})
+    query = f"SELECT * FROM CALIFORNIA_COVID_ANALYTICS.RAW.CA_COUNTY_DEMOGRAPHICS_2020 WHERE {where}"
 
     result = fetch_query_cached(query, tuple(params))
     if not result:
@@ -68,14 +168,8 @@ def get_demographics(county: str = Query(None)):
 # --- Endpoint 2: cases ---
 @app.get("/cases")
 def get_cases(date: str = Query(None), county: str = Query(None)):
-    query = "SELECT * FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CASES WHERE 1=1"
-    params = []
-    if county:
-        query += " AND AREA = %s"
-        params.append(county)
-    if date:
-        query += " AND DATE = %s"
-        params.append(date)
+    where, params = null_guarded({"AREA = %s": county, "DATE = %s": date})
+    query = f"SELECT * FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CASES WHERE {where}"
 
     result = fetch_query_cached(query, tuple(params))
     if not result:
@@ -86,14 +180,8 @@ def get_cases(date: str = Query(None), county: str = Query(None)):
 # --- Endpoint 3: cases demographics ---
 @app.get("/cases-demographics")
 def get_cases_demographics(date: str = Query(None), category: str = Query(None)):
-    query = "SELECT * FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CASES_DEMOGRAPHICS WHERE 1=1"
-    params = []
-    if category:
-        query += " AND DEMOGRAPHIC_CATEGORY = %s"
-        params.append(category)
-    if date:
-        query += " AND REPORT_DATE = %s"
-        params.append(date)
+    where, params = null_guarded({"DEMOGRAPHIC_CATEGORY = %s": category, "REPORT_DATE = %s": date})
+    query = f"SELECT * FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CASES_DEMOGRAPHICS WHERE {where}"
 
     result = fetch_query_cached(query, tuple(params))
     if not result:
@@ -104,14 +192,8 @@ def get_cases_demographics(date: str = Query(None), category: str = Query(None))
 # --- Endpoint 4: hospitals ---
 @app.get("/hospitals")
 def get_hospitals(date: str = Query(None), county: str = Query(None)):
-    query = "SELECT * FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.HOSPITALS_BY_COUNTY WHERE 1=1"
-    params = []
-    if county:
-        query += " AND COUNTY = %s"
-        params.append(county)
-    if date:
-        query += " AND TODAYS_DATE = %s"
-        params.append(date)
+    where, params = null_guarded({"COUNTY = %s": county, "TODAYS_DATE = %s": date})
+    query = f"SELECT * FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.HOSPITALS_BY_COUNTY WHERE {where}"
 
     result = fetch_query_cached(query, tuple(params))
     if not result:
@@ -119,21 +201,71 @@ def get_hospitals(date: str = Query(None), county: str = Query(None)):
     return result if not (county and date) else result[0]
 
 
+# --- Column allowlist for an ANALYTICS table or view (read once from the schema) ---
+def get_table_columns(table: str) -> set:
+    query = "SELECT COLUMN_NAME FROM CALIFORNIA_COVID_ANALYTICS.INFORMATION_SCHEMA.COLUMNS " \
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s"
+    return {row["COLUMN_NAME"] for row in fetch_query_cached(query, ("ANALYTICS", table))}
+
+
+# --- Validated SELECT list from a comma-separated columns parameter ---
+def build_select_list(columns: str, table: str):
+    requested = [col.strip().upper() for col in columns.split(",") if col.strip()]
+    allowed = get_table_columns(table)
+    invalid = [col for col in requested if col not in allowed]
+    if invalid:
+        return None, {"error": f"Invalid columns {invalid}. Choose from {sorted(allowed)}"}
+    return ", ".join(dict.fromkeys(["AREA"] + requested)), None
+
+
 # --- Endpoint 5: cases + demographics (analytics view) ---
 @app.get("/cases-demographics-view")
 def get_cases_demographics_view(county: str = Query(None), date: str = Query(None),
-                                start_date: str = Query(None), end_date: str = Query(None)):
-    query = "SELECT * FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_CASES_DEMOGRAPHICS_VIEW WHERE 1=1"
-    params = []
-    if county:
-        query += " AND AREA = %s"
-        params.append(county)
-    if date:
-        query += " AND DATE = %s"
-        params.append(date)
-    if start_date and end_date:
-        query += " AND DATE BETWEEN %s AND %s"
-        params.extend([start_date, end_date])
+                                start_date: str = Query(None), end_date: str = Query(None),
+                                columns: str = Query(None, description="Comma-separated columns to return (AREA is always included)"),
+                                stream: bool = Query(False, description="Stream rows as NDJSON instead of a JSON list"),
+                                format: str = Query("json", description="Response format: json or arrow (Arrow IPC stream)"),
+                                order_by: str = Query(None, description="Column to sort by, highest first"),
+                                limit: int = Query(None, ge=1, description="Maximum number of rows to return")):
+    if format not in ("json", "arrow"):
+        return {"error": f"Invalid format '{format}'. Choose from ['json', 'arrow']"}
+
+    select_list = "*"
+    if columns:
+        select_list, error = build_select_list(columns, "CA_CASES_DEMOGRAPHICS_VIEW")
+        if error:
+            return error
+
+    # Only a known view column can reach the ORDER BY text
+    if order_by:
+        order_by = order_by.strip().upper()
+        allowed = get_table_columns("CA_CASES_DEMOGRAPHICS_VIEW")
+        if order_by not in allowed:
+            return {"error": f"Invalid order_by '{order_by}'. Choose from {sorted(allowed)}"}
+
+    # The date range only applies when both ends are given
+    has_range = bool(start_date and end_date)
+    where, params = null_guarded({
+        "AREA = %s": county,
+        "DATE = %s": date,
+        "DATE >= %s": start_date if has_range else None,
+        "DATE <= %s": end_date if has_range else None
+    })
+    query = f"SELECT {select_list} FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_CASES_DEMOGRAPHICS_VIEW WHERE {where}"
+    if order_by:
+        query += f" ORDER BY {order_by} DESC NULLS LAST"
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    if format == "arrow":
+        table = fetch_arrow_cached(query, tuple(params))
+        if table is None:
+            return {"error": "No data found with given filters"}
+        return arrow_response(table)
+
+    if stream:
+        return StreamingResponse(stream_query(query, tuple(params)), media_type="application/x-ndjson")
 
     result = fetch_query_cached(query, tuple(params))
     if not result:
@@ -147,14 +279,15 @@ def get_cases_demographics_view(county: str = Query(None), date: str = Query(Non
 @app.get("/summary/county")
 def get_cases_summary_by_county(start_date: str = Query(None), end_date: str = Query(None),
                                 metric: str = Query("cases_per_100k"), limit: int = Query(10)):
-    query = f"SELECT AREA, AVG({metric}) AS avg_{metric} FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_CASES_DEMOGRAPHICS_AGG WHERE 1=1"
-    params = []
-    if start_date:
-        query += " AND DATE >= %s"
-        params.append(start_date)
-    if end_date:
-        query += " AND DATE <= %s"
-        params.append(end_date)
+    valid_metrics = {"cases_per_100k": "CASES_PER_100K", "deaths_per_100k": "DEATHS_PER_100K"}
+
+    # Only allowlisted column names reach the SQL text
+    metric = metric.lower()
+    if metric not in valid_metrics:
+        return {"error": f"Invalid metric '{metric}'. Choose from {list(valid_metrics.keys())}"}
+
+    where, params = null_guarded({"DATE >= %s": start_date, "DATE <= %s": end_date})
+    query = f"SELECT AREA, AVG({valid_metrics[metric]}) AS avg_{metric} FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_CASES_DEMOGRAPHICS_AGG WHERE {where}"
     query += f" GROUP BY AREA ORDER BY avg_{metric} DESC LIMIT %s"
     params.append(limit)
 
@@ -164,59 +297,52 @@ def get_cases_summary_by_county(start_date: str = Query(None), end_date: str = Q
 
 # --- Endpoint 7: Summary by trend ---
 @app.get("/summary/trend")
-def get_trend(county: str = Query(None), metric: str = Query(None), interval: str = Query("day")):
+def get_trend(county: str = Query(None), metric: str = Query(None), interval: str = Query("day"),
+              counties: str = Query(None, description="Comma-separated counties; returns one series per AREA")):
     valid_metrics = {"cases": "TOTAL_CASES", "deaths": "TOTAL_DEATHS",
                      "cases_p_k": "CASES_PER_100K", "deaths_p_k": "DEATHS_PER_100K"}
+    valid_intervals = {"day": "DATE", "month": "DATE_TRUNC('month', DATE)"}
 
     if metric and metric not in valid_metrics:
         return {"error": f"Invalid metric '{metric}'. Choose from {list(valid_metrics.keys())}"}
+    if interval not in valid_intervals:
+        return {"error": f"Invalid interval '{interval}'. Choose from {list(valid_intervals.keys())}"}
 
+    # Averages are cast to FLOAT so the connector returns native floats instead of Decimals
     if metric:
         if metric in ["cases", "deaths"]:
             select_clause = f"SUM({valid_metrics[metric]}) AS total_{metric}"
         else:
-            select_clause = f"AVG({valid_metrics[metric]}) AS {valid_metrics[metric]}"
+            select_clause = f"AVG({valid_metrics[metric]})::FLOAT AS {valid_metrics[metric]}"
     else:
         select_clause = "SUM(TOTAL_CASES) AS TOTAL_CASES, SUM(TOTAL_DEATHS) AS TOTAL_DEATHS, " \
-                        "AVG(CASES_PER_100K) AS CASES_PER_100K, AVG(DEATHS_PER_100K) AS DEATHS_PER_100K"
+                        "AVG(CASES_PER_100K)::FLOAT AS CASES_PER_100K, AVG(DEATHS_PER_100K)::FLOAT AS DEATHS_PER_100K"
 
-    date_expr = "DATE_TRUNC('month', DATE)" if interval == "month" else "DATE"
-    query = f"SELECT {date_expr} AS period, {select_clause} FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_TREND_MV WHERE 1=1"
-    params = []
-    if county:
-        query += " AND AREA = %s"
-        params.append(county)
+    # Several counties are fetched in one scan, grouped per AREA
+    area_list = [c.strip() for c in counties.split(",") if c.strip()] if counties else []
+    area_select = "AREA, " if area_list else ""
+
+    date_expr = valid_intervals[interval]
+    where, params = null_guarded({"AREA = %s": county})
+    query = f"SELECT {area_select}TO_DATE({date_expr}) AS period, {select_clause} FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_TREND_MV WHERE DATE IS NOT NULL AND {where}"
+    if metric:
+        query += f" AND {valid_metrics[metric]} IS NOT NULL"
+    if area_list:
+        query += f" AND AREA IN ({', '.join(['%s'] * len(area_list))})"
+        params.extend(area_list)
+    group_by = "AREA, period" if area_list else "period"
+    query += f" GROUP BY {group_by} ORDER BY {group_by}"
 
     result = fetch_query_cached(query, tuple(params))
     return result
 
 
-# --- Endpoint 8: Comments for charts ---
-@lru_cache(maxsize=512)
-@app.get("/comments")
-def get_comments(
-    chart: str = Query(..., description="Chart type (e.g., 'Demographic Chart')"),
-    metric: Optional[str] = Query(None, description="Metric name, if applicable"),
-    date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format, if applicable"),
-    category: Optional[str] = Query(None, description="Category (for Demographic Chart)"),
-    interval: Optional[str] = Query(None, description="Interval (for Trend Chart)"),
-    counties: Optional[str] = Query(None, description="Counties (for Trend Chart)")
-):
-    """
-    Get comments added by users on the dashboard, filtered by chart and other parameters.
-    """
-    
-    # --- Local MongoDB connection ---
-    client = MongoClient("mongodb://localhost:27017")
-    
-    # --- Clustered MongoDB connection (commented) ---
-    # MONGO_USER = os.getenv("MONGO_USER")
-    # MONGO_PASSWORD = os.getenv("MONGO_PASSWORD")
-    # MONGO_CLUSTER = os.getenv("MONGO_CLUSTER")  # e.g., cluster0.abcde.mongodb.net
-    # client = MongoClient(f"mongodb+srv://{MONGO_USER}:{MONGO_PASSWORD}@{MONGO_CLUSTER}/?retryWrites=true&w=majority")
-    
-    db = client["covid_dashboard"]
-    comments_col = db["annotations"]
+# --- Cached comments lookup ---
+# Short TTL: the dashboard keeps adding comments, so entries must not outlive a minute
+@cached(TTLCache(maxsize=512, ttl=COMMENTS_CACHE_TTL), lock=threading.Lock())
+def _comments_cached(chart: str, metric: Optional[str], date: Optional[str], category: Optional[str],
+                     interval: Optional[str], counties: Optional[str]) -> tuple:
+    comments_col = mongo_client["covid_dashboard"]["annotations"]
 
     # Build dynamic filter based on provided query parameters
     filter_criteria = {"chart": chart}
@@ -232,7 +358,45 @@ def get_comments(
         filter_criteria["counties"] = counties
 
     # Fetch matching comments, newest first
-    comments = list(comments_col.find(filter_criteria, {"_id": 0}).sort("timestamp", -1))
+    return tuple(comments_col.find(filter_criteria, {"_id": 0}).sort("timestamp", -1))
 
-    client.close()
-    return comments
\ No newline at end of file
+
+# --- Endpoint 8: Comments for charts ---
+@app.get("/comments")
+def get_comments(
+    chart: str = Query(..., description="Chart type (e.g., 'Demographic Chart')"),
+    metric: Optional[str] = Query(None, description="Metric name, if applicable"),
+    date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format, if applicable"),
+    category: Optional[str] = Query(None, description="Category (for Demographic Chart)"),
+    interval: Optional[str] = Query(None, description="Interval (for Trend Chart)"),
+    counties: Optional[str] = Query(None, description="Counties (for Trend Chart)")
+):
+    """
+    Get comments added by users on the dashboard, filtered by chart and other parameters.
+    """
+    return _comments_cached(chart, metric or None, date or None, category or None,
+                            interval or None, counties or None)
+
+
+# --- Endpoint 9: County names ---
+@app.get("/counties")
+def get_counties():
+    query = "SELECT DISTINCT COUNTY_NAME FROM CALIFORNIA_COVID_ANALYTICS.RAW.CA_COUNTY_DEMOGRAPHICS_2020 " \
+            "WHERE COUNTY_NAME IS NOT NULL ORDER BY 1"
+    return fetch_query_cached(query)
+
+
+# --- Endpoint 10: Per-county clustering features ---
+@app.get("/cluster-features")
+def get_cluster_features(columns: str = Query(None, description="Comma-separated columns to return (AREA is always included)")):
+    select_list = "*"
+    if columns:
+        select_list, error = build_select_list(columns, "CA_COUNTY_CLUSTER_FEATURES")
+        if error:
+            return error
+
+    query = f"SELECT {select_list} FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_COUNTY_CLUSTER_FEATURES ORDER BY AREA"
+    result = fetch_query_cached(query)
+    if not result:
+        return {"error": "No cluster features found"}
+    return result
@@ -1,31 +1,45 @@
 import os
+import numpy as np
 import pandas as pd
+from numba import njit, prange
 import snowflake.connector
 from dotenv import load_dotenv
 from snowflake.connector.pandas_tools import write_pandas
 
+
+# Sum the 19 source age-band columns into the 4 grouped buckets
+# (0-19, 20-49, 50-64, 65+), one compiled parallel pass over the rows
+@njit(parallel=True, fastmath=True)
+def bucket_sums(a):
+    out = np.empty((a.shape[0], 4), a.dtype)
+    for i in prange(a.shape[0]):
+        out[i, 0] = a[i, 0] + a[i, 1] + a[i, 2] + a[i, 3] + a[i, 4]
+        out[i, 1] = a[i, 5] + a[i, 6] + a[i, 7] + a[i, 8] + a[i, 9] + a[i, 10]
+        out[i, 2] = a[i, 11] + a[i, 12] + a[i, 13]
+        out[i, 3] = a[i, 14] + a[i, 15] + a[i, 16] + a[i, 17] + a[i, 18]
+    return out
+
+
 # -----------------------------
 # Step 1: Process California Demographics
 # -----------------------------
 # Load Kaggle demographics file
 df = pd.read_csv("county_demographics.csv")
 
-# Ensure FIPS are zero-padded strings
-df["fips"] = df["fips"].astype(str).str.zfill(5)
+# Ensure FIPS are zero-padded strings (Arrow-backed, so padding runs as a compiled kernel)
+df["fips"] = df["fips"].astype("string[pyarrow]").str.pad(5, side="left", fillchar="0")
 
 # Filter for California (FIPS starting with 06) and year 2020
 df_ca_2020 = df[(df["year"] == 2020) & (df["fips"].str.startswith("06"))].copy()
 
 # Create grouped age categories
-df_ca_2020["age_0_19_population"] = df_ca_2020[["age0_population","age1_population","age2_population","age3_population","age4_population"]].sum(axis=1)
-df_ca_2020["age_20_49_population"] = df_ca_2020[["age5_population","age6_population","age7_population","age8_population","age9_population","age10_population"]].sum(axis=1)
-df_ca_2020["age_50_64_population"] = df_ca_2020[["age11_population","age12_population","age13_population"]].sum(axis=1)
-df_ca_2020["age_65_plus_population"] = df_ca_2020[["age14_population","age15_population","age16_population","age17_population","age18_population"]].sum(axis=1)
+age_buckets = ["age_0_19", "age_20_49", "age_50_64", "age_65_plus"]
+
+ages = np.ascontiguousarray(df_ca_2020[[f"age{i}_population" for i in range(19)]].to_numpy())
+age_ratios = np.ascontiguousarray(df_ca_2020[[f"age{i}_population_ratio" for i in range(19)]].to_numpy())
 
-df_ca_2020["age_0_19_population_ratio"] = df_ca_2020[["age0_population_ratio","age1_population_ratio","age2_population_ratio","age3_population_ratio","age4_population_ratio"]].sum(axis=1)
-df_ca_2020["age_20_49_population_ratio"] = df_ca_2020[["age5_population_ratio","age6_population_ratio","age7_population_ratio","age8_population_ratio","age9_population_ratio","age10_population_ratio"]].sum(axis=1)
-df_ca_2020["age_50_64_population_ratio"] = df_ca_2020[["age11_population_ratio","age12_population_ratio","age13_population_ratio"]].sum(axis=1)
-df_ca_2020["age_65_plus_population_ratio"] = df_ca_2020[["age14_population_ratio","age15_population_ratio","age16_population_ratio","age17_population_ratio","age18_population_ratio"]].sum(axis=1)
+df_ca_2020[[f"{name}_population" for name in age_buckets]] = bucket_sums(ages)
+df_ca_2020[[f"{name}_population_ratio" for name in age_buckets]] = bucket_sums(age_ratios)
 
 # Select relevant columns
 relevant_columns = [
@@ -38,10 +52,10 @@ df_ca_2020_final = df_ca_2020[relevant_columns]
 
 # Merge with county names
 fips_url = "https://raw.githubusercontent.com/kjhealy/fips-codes/master/state_and_county_fips_master.csv"
-fips_df = pd.read_csv(fips_url, dtype=str)
-ca_fips = fips_df[fips_df['state'] == 'CA'][['fips','name']]
-ca_fips['fips'] = ca_fips['fips'].str.zfill(5)
-ca_fips['name'] = ca_fips['name'].str.replace(" County$", "", regex=True)
+fips_df = pd.read_csv(fips_url, dtype="string[pyarrow]")
+ca_fips = fips_df[fips_df['state'] == 'CA'][['fips','name']].copy()
+ca_fips['fips'] = ca_fips['fips'].str.pad(5, side="left", fillchar="0")
+ca_fips['name'] = ca_fips['name'].str.removesuffix(" County")
 
 df_ca_2020_named = df_ca_2020_final.merge(ca_fips, on="fips", how="left")
 df_ca_2020_named.rename(columns={"name": "county_name"}, inplace=True)
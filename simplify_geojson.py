@@ -0,0 +1,35 @@
+import json
+import requests
+from shapely.geometry import shape, mapping
+
+# -----------------------------
+# One-off: build a compact California counties GeoJSON for the dashboard map
+# -----------------------------
+GEOJSON_URL = "https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json"
+OUTPUT_PATH = "ca_counties_simplified.json"
+TOLERANCE = 0.005  # simplification tolerance in degrees (~500 m)
+PRECISION = 5      # decimal places kept per coordinate (~1 m)
+
+
+def round_coords(coords):
+    # A position is a flat pair of numbers; anything else is a nested ring/polygon list
+    if isinstance(coords[0], (int, float)):
+        return [round(c, PRECISION) for c in coords]
+    return [round_coords(c) for c in coords]
+
+
+# Load US counties and keep California (FIPS starting with 06)
+geojson = requests.get(GEOJSON_URL, timeout=30).json()
+features = [f for f in geojson["features"] if f["id"].startswith("06")]
+
+# Simplify each county polygon and truncate coordinates
+for feature in features:
+    geometry = mapping(shape(feature["geometry"]).simplify(TOLERANCE, preserve_topology=True))
+    feature["geometry"] = {"type": geometry["type"], "coordinates": round_coords(geometry["coordinates"])}
+
+geojson["features"] = features
+
+with open(OUTPUT_PATH, "w") as f:
+    json.dump(geojson, f, separators=(",", ":"))
+
+print(f"Saved {len(features)} simplified California counties to {OUTPUT_PATH}")
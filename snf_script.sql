@@ -68,7 +68,7 @@ SELECT
     D.AGE_65_PLUS_POPULATION_RATIO AS AGE_65_PLUS_POPULATION_RATIO,
     (C.CASES / C.POPULATION) * 100000 AS CASES_PER_100K,
     (C.DEATHS / C.POPULATION) * 100000 AS DEATHS_PER_100K,
-    D.FIPS
+    LPAD(D.FIPS, 5, '0') AS FIPS  -- zero-padded here so consumers can match GeoJSON ids directly
 FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CASES C
 JOIN RAW.CA_COUNTY_DEMOGRAPHICS_2020 D
   ON UPPER(TRIM(C.AREA)) = UPPER(TRIM(D.COUNTY_NAME));
@@ -93,4 +93,27 @@ FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_CASES_DEMOGRAPHICS_AGG;
 
 
 ALTER TABLE CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_CASES_DEMOGRAPHICS_AGG
-CLUSTER BY (DATE, AREA);
\ No newline at end of file
+CLUSTER BY (DATE, AREA);
+
+
+-- Materialized views can't read from a (join) view, so the
+-- per-county clustering features are precomputed as a table like CA_CASES_DEMOGRAPHICS_AGG.
+CREATE OR REPLACE TABLE CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_COUNTY_CLUSTER_FEATURES AS
+SELECT
+    AREA,
+    AVG(CASES_PER_100K) AS CASES_PER_100K,
+    AVG(DEATHS_PER_100K) AS DEATHS_PER_100K,
+    AVG(MALE_POPULATION_RATIO) AS MALE_POPULATION_RATIO,
+    AVG(FEMALE_POPULATION_RATIO) AS FEMALE_POPULATION_RATIO,
+    AVG(W_POPULATION_RATIO) AS W_POPULATION_RATIO,
+    AVG(B_POPULATION_RATIO) AS B_POPULATION_RATIO,
+    AVG(O_POPULATION_RATIO) AS O_POPULATION_RATIO,
+    AVG(NH_POPULATION_RATIO) AS NH_POPULATION_RATIO,
+    AVG(HI_POPULATION_RATIO) AS HI_POPULATION_RATIO,
+    AVG(NA_POPULATION_RATIO) AS NA_POPULATION_RATIO,
+    AVG(AGE_0_19_POPULATION_RATIO) AS AGE_0_19_POPULATION_RATIO,
+    AVG(AGE_20_49_POPULATION_RATIO) AS AGE_20_49_POPULATION_RATIO,
+    AVG(AGE_50_64_POPULATION_RATIO) AS AGE_50_64_POPULATION_RATIO,
+    AVG(AGE_65_PLUS_POPULATION_RATIO) AS AGE_65_PLUS_POPULATION_RATIO
+FROM CALIFORNIA_COVID_ANALYTICS.ANALYTICS.CA_CASES_DEMOGRAPHICS_VIEW
+GROUP BY AREA;
@@ -1,9 +1,21 @@
+import json
+import time
+import atexit
+import threading
 import pandas as pd
 import requests
+import pyarrow as pa
 import datetime
+from pathlib import Path
+from cachetools import TTLCache, cached
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import plotly.express as px
-from dash import Dash, dcc, html, Input, Output, ctx  
-from pymongo import MongoClient
+from dash import Dash, dcc, html, Input, Output, State, ctx  
+from dash.exceptions import PreventUpdate
+from flask_caching import Cache
+from pymongo import MongoClient, InsertOne, WriteConcern
+from pymongo.errors import PyMongoError
 
 
 # ------------------------------
@@ -15,7 +27,7 @@ def get_mongo_client(local=True):
     Set local=False to use credentials from .env for a cluster.
     """
     if local:
-        return MongoClient("mongodb://localhost:27017/")
+        return MongoClient("mongodb://localhost:27017/", maxPoolSize=50)
     else:
         # Clustered MongoDB connection
         # from dotenv import load_dotenv
@@ -28,69 +40,278 @@ def get_mongo_client(local=True):
         # )
         raise NotImplementedError("Cluster connection not implemented in this example.")
 
+# Created once and reused by every callback; pymongo pools connections internally
+MONGO_CLIENT = get_mongo_client(local=True)
+ANNOT = MONGO_CLIENT["covid_dashboard"]["annotations"]
+# Comments are non-critical: write them unacknowledged (w=0); reads keep the default
+ANNOT_WRITER = ANNOT.with_options(write_concern=WriteConcern(w=0))
+
+# One compound index per comment query shape: equality fields first, then the
+# timestamp sort, so lookups are index scans with no in-memory sort
+ANNOTATION_INDEXES = [
+    [("chart", 1), ("timestamp", -1)],
+    [("chart", 1), ("date", 1), ("timestamp", -1)],                                    # Scatter Chart
+    [("chart", 1), ("metric", 1), ("date", 1), ("timestamp", -1)],                     # Choropleth Map, Comparative Chart
+    [("chart", 1), ("metric", 1), ("date", 1), ("category", 1), ("timestamp", -1)],    # Demographic Chart
+    [("chart", 1), ("metric", 1), ("interval", 1), ("timestamp", -1)],                 # Trend Chart
+]
+
+def ensure_annotation_indexes():
+    """
+    Create the annotations indexes if missing (no-op when they already exist).
+    Runs in a background thread, so startup never waits on MongoDB server selection;
+    if MongoDB is unavailable a warning is printed and the dashboard runs without them.
+    """
+    try:
+        for keys in ANNOTATION_INDEXES:
+            ANNOT.create_index(keys)
+    except PyMongoError as e:
+        print(f"⚠️ Could not create MongoDB indexes: {e}")
+
+threading.Thread(target=ensure_annotation_indexes, daemon=True).start()
+
+# Comment writes are queued and flushed in bulk by a background thread
+COMMENT_FLUSH_INTERVAL = 0.5  # seconds
+_PENDING_COMMENTS = []
+_PENDING_LOCK = threading.Lock()
+
+def flush_pending_comments():
+    """
+    Write all queued comments to MongoDB in a single unordered bulk_write.
+    """
+    with _PENDING_LOCK:
+        drained = _PENDING_COMMENTS[:]
+        _PENDING_COMMENTS.clear()
+
+    if drained:
+        try:
+            ANNOT_WRITER.bulk_write([InsertOne(doc) for doc in drained], ordered=False)
+        except PyMongoError as e:
+            print(f"❌ Error saving {len(drained)} comment(s): {e}")
+
+def _flush_comments_forever():
+    while True:
+        time.sleep(COMMENT_FLUSH_INTERVAL)
+        flush_pending_comments()
+
+threading.Thread(target=_flush_comments_forever, daemon=True).start()
+atexit.register(flush_pending_comments)
+
 def insert_comment(chart, comment_text, **kwargs):
     """
-    Insert a comment into the MongoDB annotations collection.
-    kwargs can include metric, date, category, interval, counties, etc.
+    Queue a comment for the MongoDB annotations collection; it is written by the
+    next background bulk flush. kwargs can include metric, date, category, interval, counties, etc.
     """
     if not comment_text or comment_text.strip() == "":
         return "⚠️ Please enter a comment before submitting."
 
-    client = get_mongo_client(local=True)
-    db = client["covid_dashboard"]
-    annotations_col = db["annotations"]
-
     doc = {
         "chart": chart,
         "comment": comment_text.strip(),
-        "timestamp": datetime.datetime.utcnow()
+        "timestamp": datetime.datetime.now(datetime.timezone.utc)
     }
     doc.update(kwargs)  # add extra fields dynamically
 
-    try:
-        annotations_col.insert_one(doc)
-        return "✅ Comment submitted successfully!"
-    except Exception as e:
-        return f"❌ Error saving comment: {str(e)}"
-    finally:
-        client.close()
+    with _PENDING_LOCK:
+        _PENDING_COMMENTS.append(doc)
+    return "✅ Comment submitted successfully!"
+
 
+COMMENTS_PAGE_SIZE = 50  # comments shown per page / per "Load more" click
+COMMENT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S UTC"  # same specifiers in MongoDB's $dateToString and strftime
 
-def fetch_comments(chart, **filters):
+def fetch_comments(chart, before=None, **filters):
     """
-    Fetch comments for a chart with optional filters.
-    Returns a list of Dash HTML elements for display.
+    Fetch one page of comments for a chart with optional filters, newest first.
+    `before` is a keyset cursor: only comments older than that timestamp are returned.
+    Returns (list of Dash HTML elements, cursor for the next page or None).
     """
-    client = get_mongo_client(local=True)
-    db = client["covid_dashboard"]
-    annotations_col = db["annotations"]
-
-    try:
-        comments = list(
-            annotations_col.find({"chart": chart, **filters}).sort("timestamp", -1)
-        )
-    finally:
-        client.close()
-
-    if not comments:
-        return [html.P("No comments yet for this selection.", style={'color': 'gray'})]
-
+    query = {"chart": chart, **filters}
+    if before is not None:
+        query["timestamp"] = {"$lt": before}
+
+    # Timestamps are formatted by MongoDB; the raw value is kept for the next-page cursor
+    comments = list(ANNOT.aggregate([
+        {"$match": query},
+        {"$sort": {"timestamp": -1}},
+        {"$limit": COMMENTS_PAGE_SIZE},
+        {"$project": {
+            "_id": 0, "comment": 1, "timestamp": 1,
+            "posted": {"$dateToString": {"format": COMMENT_TIME_FORMAT, "date": "$timestamp"}}
+        }}
+    ]))
+
+    if before is None:
+        # Show comments still waiting for the bulk flush too (newest first)
+        with _PENDING_LOCK:
+            pending = [
+                {**doc, "posted": doc["timestamp"].strftime(COMMENT_TIME_FORMAT)}
+                for doc in _PENDING_COMMENTS
+                if doc["chart"] == chart and all(doc.get(k) == v for k, v in filters.items())
+            ]
+        comments = (pending[::-1] + comments)[:COMMENTS_PAGE_SIZE]
+
+        if not comments:
+            return [html.P("No comments yet for this selection.", style={'color': 'gray'})], None
+
+    # At most one page (COMMENTS_PAGE_SIZE) of elements is built per call
     comments_list = [
         html.Div([
             html.P(f"📝 {c['comment']}", style={'margin': '2px 0'}),
-            html.Small(c['timestamp'].strftime("%Y-%m-%d %H:%M:%S UTC"), style={'color': 'gray'})
+            html.Small(c['posted'], style={'color': 'gray'})
         ], style={'padding': '6px', 'borderBottom': '1px solid #ddd'})
         for c in comments
     ]
-    return comments_list
+    cursor = comments[-1]['timestamp'].isoformat() if len(comments) == COMMENTS_PAGE_SIZE else None
+    return comments_list, cursor
+
+def comments_page(chart, load_more, shown, cursor, **filters):
+    """
+    Returns (children, cursor) for a comments list: the first page after a selection
+    change or submit, or the next page appended to `shown` when "Load more" was clicked.
+    """
+    if not load_more:
+        return fetch_comments(chart, **filters)
+    if not cursor:
+        raise PreventUpdate  # every comment is already shown
+
+    more, cursor = fetch_comments(chart, before=datetime.datetime.fromisoformat(cursor), **filters)
+    return (shown or []) + more, cursor
+
+
+# ------------------------------
+# GeoJSON Helper Functions
+# ------------------------------
+GEOJSON_URL = "https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json"
+GEOJSON_PATH = Path(__file__).with_name("ca_counties.json")
+GEOJSON_SIMPLIFIED_PATH = Path(__file__).with_name("ca_counties_simplified.json")  # built by simplify_geojson.py
+GEOJSON_MAX_AGE = 30 * 24 * 60 * 60  # seconds before the cached file is downloaded again
+
+def load_ca_geojson():
+    """
+    Returns California county boundaries (FIPS starting with 06).
+    Prefers the pre-simplified file; otherwise downloads once and caches on disk,
+    so map renders don't refetch the US-wide file.
+    If the download fails, a stale cached file is used; with no file at all the map is empty.
+    """
+    if GEOJSON_SIMPLIFIED_PATH.exists():
+        with GEOJSON_SIMPLIFIED_PATH.open() as f:
+            return json.load(f)
+
+    if GEOJSON_PATH.exists() and time.time() - GEOJSON_PATH.stat().st_mtime < GEOJSON_MAX_AGE:
+        with GEOJSON_PATH.open() as f:
+            return json.load(f)
+
+    try:
+        response = requests.get(GEOJSON_URL, timeout=30)
+        response.raise_for_status()
+        geojson = response.json()
+    except (requests.RequestException, ValueError) as e:
+        if GEOJSON_PATH.exists():
+            print(f"⚠️ Could not refresh county GeoJSON, using the cached copy: {e}")
+            with GEOJSON_PATH.open() as f:
+                return json.load(f)
+        print(f"⚠️ Could not download county GeoJSON, the map will be empty: {e}")
+        return {"type": "FeatureCollection", "features": []}
+
+    geojson["features"] = [f for f in geojson["features"] if f["id"].startswith("06")]
+
+    with GEOJSON_PATH.open("w") as f:
+        json.dump(geojson, f)
+    return geojson
+
+GEOJSON = load_ca_geojson()
 
 
 # --- FastAPI API base URL ---
 API_BASE = "http://127.0.0.1:8000"
+API_TIMEOUT = 30  # seconds; cold Snowflake queries behind the API can take a while
+
+# --- Shared HTTP session (keep-alive, pooled connections to the API) ---
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
+
+# ------------------------------
+# API Helper Functions
+# ------------------------------
+# Known column types of /cases-demographics-view; counts are float32 so missing values stay NaN
+VIEW_DTYPES = {
+    'AREA': 'category',
+    'FIPS': 'string',
+    'CASES': 'float32',
+    'DEATHS': 'float32',
+    'TOTAL_TESTS': 'float32',
+    'CASES_PER_100K': 'float32',
+    'DEATHS_PER_100K': 'float32'
+}
+
+class NoDataError(requests.RequestException):
+    """
+    The API answered without rows (e.g. {"error": "No data found ..."}).
+    A RequestException, so callers handle it like a failed request.
+    """
+
+def api_get(path, dtypes=None, **params):
+    """
+    GET an API endpoint and return its records as a DataFrame.
+    Arrow IPC stream bodies (format="arrow") are decoded directly, without JSON parsing.
+    Columns listed in `dtypes` are cast to the given type instead of keeping the inferred one.
+    Raises on HTTP errors and empty results, so neither is cached by the helpers below.
+    """
+    response = SESSION.get(f"{API_BASE}{path}", params=params, timeout=API_TIMEOUT)
+    response.raise_for_status()
+    if response.headers.get("content-type", "").startswith("application/vnd.apache.arrow.stream"):
+        df = pa.ipc.open_stream(response.content).read_pandas()
+    else:
+        data = response.json()
+        df = pd.DataFrame.from_records(data if isinstance(data, list) else [])
+    if df.empty:
+        raise NoDataError(f"No data returned by {path}")
+    if dtypes:
+        df = df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns})
+    return df
+
+# Cached per argument tuple: flipping back to a seen date/metric skips the HTTP round trip.
+# Entries expire after an hour; the API keeps its own 24h Snowflake cache behind this one.
+# Callers must treat the returned DataFrames as read-only.
+FETCH_CACHE_TTL = 60 * 60  # seconds
+
+@cached(TTLCache(maxsize=256, ttl=FETCH_CACHE_TTL), lock=threading.Lock())
+def fetch_view(date):
+    return api_get("/cases-demographics-view", dtypes=VIEW_DTYPES, format="arrow", date=date)
+
+@cached(TTLCache(maxsize=256, ttl=FETCH_CACHE_TTL), lock=threading.Lock())
+def fetch_view_top(date, metric, top_n):
+    """
+    Fetch the top_n counties by metric on a date; sorting and limiting run in the API query.
+    """
+    return api_get("/cases-demographics-view", dtypes=VIEW_DTYPES, format="arrow", date=date,
+                   columns=metric, order_by=metric, limit=top_n)
+
+@cached(TTLCache(maxsize=256, ttl=FETCH_CACHE_TTL), lock=threading.Lock())
+def fetch_cases_demographics(date):
+    return api_get("/cases-demographics", date=date)
+
+@cached(TTLCache(maxsize=256, ttl=FETCH_CACHE_TTL), lock=threading.Lock())
+def fetch_trend(metric, interval, county=None):
+    """
+    Fetch one trend series as PERIOD, VALUE, AREA columns. Without a county, returns all of California.
+    """
+    df = api_get("/summary/trend", metric=metric, interval=interval, county=county)
+    # Renamed once here, so cached series concatenate without a per-render rename
+    df = df.rename(columns={f"TOTAL_{metric.upper()}": "VALUE"})
+    df["AREA"] = county or "California"
+    return df
 
 # ---------- Dash App ----------
+# Figure callbacks return plain dicts (fig.to_dict()), which Dash sends as-is.
 app = Dash(__name__)
 
+# Built figures are memoized per argument tuple; use CACHE_TYPE 'RedisCache' when running several workers
+FIGURE_CACHE_TIMEOUT = 600  # seconds
+cache = Cache(app.server, config={'CACHE_TYPE': 'SimpleCache'})
+
 metrics = {
     'Cases': 'CASES',
     'Deaths': 'DEATHS',
@@ -120,6 +341,15 @@ counties_list = [
     "Solano", "Sonoma", "Stanislaus", "Sutter", "Tehama", "Trinity", "Tulare", "Tuolumne", "Ventura", "Yolo", "Yuba"
 ]
 
+# Dropdown options, built once at import and shared by the layout
+METRIC_OPTS = [{'label': k, 'value': v} for k, v in metrics.items()]
+COMPARISON_METRIC_OPTS = [{'label': k, 'value': v} for k, v in comparison_metrics.items()]
+DEMOGRAPHIC_CATEGORY_OPTS = [{'label': c, 'value': c} for c in demographic_categories]
+DEMOGRAPHIC_METRIC_OPTS = [{'label': k, 'value': v} for k, v in demographic_metrics.items()]
+TREND_INTERVAL_OPTS = [{'label': 'Daily', 'value': 'day'}, {'label': 'Monthly', 'value': 'month'}]
+TREND_METRIC_OPTS = [{'label': 'Cases', 'value': 'cases'}, {'label': 'Deaths', 'value': 'deaths'}]
+COUNTY_OPTS = [{'label': c, 'value': c} for c in counties_list]
+
 section_style = {
     'backgroundColor': 'white',
     'padding': '30px',
@@ -150,7 +380,7 @@ app.layout = html.Div([
                 html.Label("Select Metric:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'textAlign': 'center'}),
                 dcc.Dropdown(
                     id='metric-dropdown',
-                    options=[{'label': k, 'value': v} for k, v in metrics.items()],
+                    options=METRIC_OPTS,
                     value='CASES_PER_100K',
                     clearable=False,
                     style={'width': '160px', 'height': '47px'}
@@ -175,7 +405,11 @@ app.layout = html.Div([
             html.Div(id='choropleth-comment-status', style={'marginTop': '10px', 'color': 'green'}),
             html.Hr(),
             html.H4("Comments"),
-            html.Div(id='choropleth-comments-list', style={'marginTop': '10px'})
+            html.Div(id='choropleth-comments-list', style={'marginTop': '10px'}),
+            html.Button("Load more", id='choropleth-load-more-btn', n_clicks=0,
+                        style={'marginTop': '10px', 'padding': '6px 14px', 'border': '1px solid #ddd',
+                               'borderRadius': '6px', 'backgroundColor': 'white', 'cursor': 'pointer'}),
+            dcc.Store(id='choropleth-comments-cursor')
         ], style={'marginTop': '20px'})
     ], style=section_style),
 
@@ -191,7 +425,7 @@ app.layout = html.Div([
 
             html.Div([
                 html.Label("Top N Counties:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'textAlign': 'center'}),
-                dcc.Input(id='top-n-input', type='number', min=1, max=58, step=1, value=5,
+                dcc.Input(id='top-n-input', type='number', min=1, max=58, step=1, value=5, debounce=True,
                           style={'width': '100px', 'height': '43px', 'textAlign': 'center', 'fontSize': '20px'})
             ], style={'margin': '0 20px'}),
 
@@ -199,7 +433,7 @@ app.layout = html.Div([
                 html.Label("Select Metric:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'textAlign': 'center'}),
                 dcc.Dropdown(
                     id='comparison-metric-dropdown',
-                    options=[{'label': k, 'value': v} for k, v in comparison_metrics.items()],
+                    options=COMPARISON_METRIC_OPTS,
                     value='CASES_PER_100K',
                     clearable=False,
                     style={'width': '160px', 'height': '47px'}
@@ -224,7 +458,11 @@ app.layout = html.Div([
             html.Div(id='comparison-comment-status', style={'marginTop': '10px', 'color': 'green'}),
             html.Hr(),
             html.H4("Comments"),
-            html.Div(id='comparison-comments-list', style={'marginTop': '10px'})
+            html.Div(id='comparison-comments-list', style={'marginTop': '10px'}),
+            html.Button("Load more", id='comparison-load-more-btn', n_clicks=0,
+                        style={'marginTop': '10px', 'padding': '6px 14px', 'border': '1px solid #ddd',
+                               'borderRadius': '6px', 'backgroundColor': 'white', 'cursor': 'pointer'}),
+            dcc.Store(id='comparison-comments-cursor')
         ])
     ], style=section_style),
 
@@ -242,7 +480,7 @@ app.layout = html.Div([
                 html.Label("Select Category:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'textAlign': 'center'}),
                 dcc.Dropdown(
                     id='demographic-category-dropdown',
-                    options=[{'label': c, 'value': c} for c in demographic_categories],
+                    options=DEMOGRAPHIC_CATEGORY_OPTS,
                     value='Race Ethnicity',
                     clearable=False,
                     style={'width': '160px', 'height': '47px'}
@@ -253,7 +491,7 @@ app.layout = html.Div([
                 html.Label("Select Metric:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'textAlign': 'center'}),
                 dcc.Dropdown(
                     id='demographic-metric-dropdown',
-                    options=[{'label': k, 'value': v} for k, v in demographic_metrics.items()],
+                    options=DEMOGRAPHIC_METRIC_OPTS,
                     value='TOTAL_CASES',
                     clearable=False,
                     style={'width': '160px', 'height': '47px'}
@@ -278,7 +516,11 @@ app.layout = html.Div([
             html.Div(id='demographic-analysis-comment-status', style={'marginTop': '10px', 'color': 'green'}),
             html.Hr(),
             html.H4("Comments"),
-            html.Div(id='demographic-analysis-comments-list', style={'marginTop': '10px'})
+            html.Div(id='demographic-analysis-comments-list', style={'marginTop': '10px'}),
+            html.Button("Load more", id='demographic-analysis-load-more-btn', n_clicks=0,
+                        style={'marginTop': '10px', 'padding': '6px 14px', 'border': '1px solid #ddd',
+                               'borderRadius': '6px', 'backgroundColor': 'white', 'cursor': 'pointer'}),
+            dcc.Store(id='demographic-analysis-comments-cursor')
         ], style={'marginTop': '20px'})
     ], style=section_style),
 
@@ -291,7 +533,7 @@ app.layout = html.Div([
                 html.Label("Select Interval:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'textAlign': 'center'}),
                 dcc.Dropdown(
                     id='trend-interval',
-                    options=[{'label': 'Daily', 'value': 'day'}, {'label': 'Monthly', 'value': 'month'}],
+                    options=TREND_INTERVAL_OPTS,
                     value='day', clearable=False, style={'width': '160px', 'height': '47px'}
                 )
             ], style={'marginRight': '20px'}),
@@ -300,7 +542,7 @@ app.layout = html.Div([
                 html.Label("Select Metric:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'textAlign': 'center'}),
                 dcc.Dropdown(
                     id='trend-metric',
-                    options=[{'label': 'Cases', 'value': 'cases'}, {'label': 'Deaths', 'value': 'deaths'}],
+                    options=TREND_METRIC_OPTS,
                     value='cases', clearable=False, style={'width': '160px', 'height': '47px'}
                 )
             ], style={'marginRight': '20px'}),
@@ -309,7 +551,7 @@ app.layout = html.Div([
                 html.Label("Select Counties:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'textAlign': 'center'}),
                 dcc.Dropdown(
                     id='trend-counties',
-                    options=[{'label': c, 'value': c} for c in counties_list],
+                    options=COUNTY_OPTS,
                     multi=True, value=[], placeholder="Leave empty for California",
                     style={'width': '260px', 'height': '47px'}
                 )
@@ -333,7 +575,11 @@ app.layout = html.Div([
             html.Div(id='trend-comment-status', style={'marginTop': '10px', 'color': 'green'}),
             html.Hr(),
             html.H4("Comments"),
-            html.Div(id='trend-comments-list', style={'marginTop': '10px'})
+            html.Div(id='trend-comments-list', style={'marginTop': '10px'}),
+            html.Button("Load more", id='trend-load-more-btn', n_clicks=0,
+                        style={'marginTop': '10px', 'padding': '6px 14px', 'border': '1px solid #ddd',
+                               'borderRadius': '6px', 'backgroundColor': 'white', 'cursor': 'pointer'}),
+            dcc.Store(id='trend-comments-cursor')
         ], style={'marginTop': '20px'})
     ], style=section_style),
 
@@ -363,7 +609,11 @@ app.layout = html.Div([
             html.Div(id='correlation-comment-status', style={'marginTop': '10px', 'color': 'green'}),
             html.Hr(),
             html.H4("Comments"),
-            html.Div(id='correlation-comments-list', style={'marginTop': '10px'})
+            html.Div(id='correlation-comments-list', style={'marginTop': '10px'}),
+            html.Button("Load more", id='correlation-load-more-btn', n_clicks=0,
+                        style={'marginTop': '10px', 'padding': '6px 14px', 'border': '1px solid #ddd',
+                               'borderRadius': '6px', 'backgroundColor': 'white', 'cursor': 'pointer'}),
+            dcc.Store(id='correlation-comments-cursor')
         ], style={'marginTop': '20px'})
     ], style=section_style)
 
@@ -372,6 +622,38 @@ app.layout = html.Div([
 
 
 # ---------- Choropleth Callback  ----------
+@cache.memoize(timeout=FIGURE_CACHE_TIMEOUT)
+def build_map_figure(selected_date_fmt, selected_metric):
+    """
+    Choropleth figure dict for one date and metric (memoized; raises on API errors).
+    """
+    df = fetch_view(selected_date_fmt)
+
+    if df.empty:
+        return {}
+
+    # WebGL-rendered map; "white-bg" needs no tiles or token and matches the old blank background
+    fig = px.choropleth_map(
+        df,
+        geojson=GEOJSON,
+        locations='FIPS',
+        color=selected_metric,
+        hover_name='AREA',
+        color_continuous_scale="Reds",
+        map_style="white-bg",
+        center={"lat": 37.5, "lon": -119.5},
+        zoom=4.5
+    )
+
+    fig.update_layout( 
+        title=f"California COVID-19 {selected_metric.replace('_',' ')} on {selected_date_fmt}", 
+        margin={"r":0,"t":50,"l":0,"b":0}, 
+        plot_bgcolor='#ffffff', 
+        paper_bgcolor='#ffffff'
+    ) 
+
+    return fig.to_dict()
+
 @app.callback(
     Output('choropleth-map', 'figure'),
     Input('date-picker-map', 'date'),
@@ -387,53 +669,25 @@ def update_map(selected_date, selected_metric):
     except Exception:
         selected_date_fmt = selected_date  # fallback in case already correct
 
-    api_url = f"{API_BASE}/cases-demographics-view" 
-    params = {"date": selected_date} 
-    response = requests.get(api_url, params=params) 
-
-    if response.status_code != 200: 
-        return {} 
-    
-    data = response.json() 
-    df = pd.DataFrame(data) 
-    df['FIPS'] = df['FIPS'].str.zfill(5)
-
-    fig = px.choropleth( 
-        df,
-        geojson='https://raw.githubusercontent.com/plotly/datasets/master/geojson-counties-fips.json', 
-        locations='FIPS', 
-        color=selected_metric, 
-        hover_name='AREA', 
-        color_continuous_scale="Reds"
-    ) 
-
-    fig.update_geos( 
-        visible=False, 
-        scope="usa", 
-        center={"lat": 37.5, "lon": -119.5}, 
-        lataxis_range=[32, 42], 
-        lonaxis_range=[-125, -114] 
-    ) 
-
-    fig.update_layout( 
-        title=f"California COVID-19 {selected_metric.replace('_',' ')} on {selected_date_fmt}", 
-        margin={"r":0,"t":50,"l":0,"b":0}, 
-        plot_bgcolor='#ffffff', 
-        paper_bgcolor='#ffffff'
-    ) 
-
-    return fig
+    try:
+        return build_map_figure(selected_date_fmt, selected_metric)
+    except requests.RequestException:
+        return {}
 
 # ---------- Choropleth Map Comments Callback  ----------
 @app.callback(
     [Output('choropleth-comment-status', 'children'),
-     Output('choropleth-comments-list', 'children')],
+     Output('choropleth-comments-list', 'children'),
+     Output('choropleth-comments-cursor', 'data')],
     [Input('choropleth-submit-btn', 'n_clicks'),
+     Input('choropleth-load-more-btn', 'n_clicks'),
      Input('metric-dropdown', 'value'),
      Input('date-picker-map', 'date')],
-    [Input('choropleth-comment-input', 'value')]
+    [State('choropleth-comment-input', 'value'),
+     State('choropleth-comments-list', 'children'),
+     State('choropleth-comments-cursor', 'data')]
 )
-def handle_choropleth_comments(n_clicks, metric, selected_date, comment_text):
+def handle_choropleth_comments(n_clicks, load_more_clicks, metric, selected_date, comment_text, shown_comments, cursor):
     triggered_id = ctx.triggered_id
     status_msg = ""
 
@@ -445,44 +699,29 @@ def handle_choropleth_comments(n_clicks, metric, selected_date, comment_text):
             date=selected_date
         )
 
-    comments_list = fetch_comments(
+    comments_list, cursor = comments_page(
         chart="Choropleth Map",
+        load_more=triggered_id == "choropleth-load-more-btn",
+        shown=shown_comments,
+        cursor=cursor,
         metric=metric,
         date=selected_date
     )
 
-    return status_msg, comments_list
+    return status_msg, comments_list, cursor
 
 
 # ---------- Comparative Chart Callback ----------
-@app.callback(
-    Output('comparison-bar-chart', 'figure'),
-    Input('date-picker-comparison', 'date'),
-    Input('comparison-metric-dropdown', 'value'),
-    Input('top-n-input', 'value')
-)
-def update_comparison_chart(selected_date, selected_metric, top_n):
-    if not selected_date or not selected_metric or not top_n:
-        return {}
-
-    # Convert to YYYY-MM-DD
-    try:
-        selected_date_fmt = datetime.datetime.fromisoformat(selected_date).strftime("%Y-%m-%d")
-    except Exception:
-        selected_date_fmt = selected_date  # fallback in case already correct
+@cache.memoize(timeout=FIGURE_CACHE_TIMEOUT)
+def build_comparison_figure(selected_date_fmt, selected_metric, top_n):
+    """
+    Top-N bar chart figure dict (memoized; raises on API errors).
+    """
+    # Fetch only the top N counties, already sorted by the API
+    df_top = fetch_view_top(selected_date_fmt, selected_metric, top_n)
 
-    # Fetch data
-    api_url = f"{API_BASE}/cases-demographics-view"
-    params = {"date": selected_date}
-    response = requests.get(api_url, params=params)
-    
-    if response.status_code != 200:
+    if df_top.empty:
         return {}
-    
-    df = pd.DataFrame(response.json())
-    
-    # Sort by metric and pick top N
-    df_top = df.sort_values(by=selected_metric, ascending=False).head(top_n)
 
     # Horizontal bar chart
     fig = px.bar(
@@ -505,18 +744,43 @@ def update_comparison_chart(selected_date, selected_metric, top_n):
         margin=dict(l=100, r=40, t=60, b=40)
     )
 
-    return fig
+    return fig.to_dict()
+
+@app.callback(
+    Output('comparison-bar-chart', 'figure'),
+    Input('date-picker-comparison', 'date'),
+    Input('comparison-metric-dropdown', 'value'),
+    Input('top-n-input', 'value')
+)
+def update_comparison_chart(selected_date, selected_metric, top_n):
+    if not selected_date or not selected_metric or not top_n:
+        return {}
+
+    # Convert to YYYY-MM-DD
+    try:
+        selected_date_fmt = datetime.datetime.fromisoformat(selected_date).strftime("%Y-%m-%d")
+    except Exception:
+        selected_date_fmt = selected_date  # fallback in case already correct
+
+    try:
+        return build_comparison_figure(selected_date_fmt, selected_metric, top_n)
+    except requests.RequestException:
+        return {}
 
 # ---------- Comparative Chart Comments Callback  ----------
 @app.callback(
     [Output('comparison-comment-status', 'children'),
-     Output('comparison-comments-list', 'children')],
+     Output('comparison-comments-list', 'children'),
+     Output('comparison-comments-cursor', 'data')],
     [Input('comparison-submit-btn', 'n_clicks'),
+     Input('comparison-load-more-btn', 'n_clicks'),
      Input('comparison-metric-dropdown', 'value'),
      Input('date-picker-comparison', 'date')],
-    [Input('comparison-comment-input', 'value')]
+    [State('comparison-comment-input', 'value'),
+     State('comparison-comments-list', 'children'),
+     State('comparison-comments-cursor', 'data')]
 )
-def handle_comparison_comments(n_clicks, metric, selected_date, comment_text):
+def handle_comparison_comments(n_clicks, load_more_clicks, metric, selected_date, comment_text, shown_comments, cursor):
     triggered_id = ctx.triggered_id
     status_msg = ""
 
@@ -528,42 +792,30 @@ def handle_comparison_comments(n_clicks, metric, selected_date, comment_text):
             date=selected_date
         )
 
-    comments_list = fetch_comments(
+    comments_list, cursor = comments_page(
         chart="Comparative Chart",
+        load_more=triggered_id == "comparison-load-more-btn",
+        shown=shown_comments,
+        cursor=cursor,
         metric=metric,
         date=selected_date
     )
 
-    return status_msg, comments_list
+    return status_msg, comments_list, cursor
 
 
 # Callback for Demographic Chart
-@app.callback(
-    Output('demographic-bar-chart', 'figure'),
-    Input('date-picker-demographics', 'date'),
-    Input('demographic-category-dropdown', 'value'),
-    Input('demographic-metric-dropdown', 'value')
-)
-def update_demographic_chart(selected_date, category, metric):
-    if not selected_date or not category or not metric:
-        return {}
-
-    # Format date
-    try:
-        selected_date_fmt = pd.to_datetime(selected_date).strftime("%Y-%m-%d")
-    except Exception:
-        selected_date_fmt = selected_date
-
+@cache.memoize(timeout=FIGURE_CACHE_TIMEOUT)
+def build_demographic_figure(selected_date_fmt, category, metric):
+    """
+    Demographic bar chart figure dict (memoized; raises on API errors).
+    """
     # Fetch data from API
-    api_url = f"{API_BASE}/cases-demographics"
-    params = {"date": selected_date_fmt}
-    response = requests.get(api_url, params=params)
+    df = fetch_cases_demographics(selected_date_fmt)
 
-    if response.status_code != 200:
+    if df.empty:
         return {}
 
-    df = pd.DataFrame(response.json())
-
     # Filter only selected category
     df_filtered = df[df["DEMOGRAPHIC_CATEGORY"] == category]
 
@@ -589,19 +841,44 @@ def update_demographic_chart(selected_date, category, metric):
         paper_bgcolor='#ffffff'  # background outside plotting area
     )
 
-    return fig
+    return fig.to_dict()
+
+@app.callback(
+    Output('demographic-bar-chart', 'figure'),
+    Input('date-picker-demographics', 'date'),
+    Input('demographic-category-dropdown', 'value'),
+    Input('demographic-metric-dropdown', 'value')
+)
+def update_demographic_chart(selected_date, category, metric):
+    if not selected_date or not category or not metric:
+        return {}
+
+    # Format date
+    try:
+        selected_date_fmt = pd.to_datetime(selected_date).strftime("%Y-%m-%d")
+    except Exception:
+        selected_date_fmt = selected_date
+
+    try:
+        return build_demographic_figure(selected_date_fmt, category, metric)
+    except requests.RequestException:
+        return {}
 
 # ---------- Demographic Analysis Comments Callback  ----------
 @app.callback(
     [Output('demographic-analysis-comment-status', 'children'),
-     Output('demographic-analysis-comments-list', 'children')],
+     Output('demographic-analysis-comments-list', 'children'),
+     Output('demographic-analysis-comments-cursor', 'data')],
     [Input('demographic-analysis-submit-btn', 'n_clicks'),
+     Input('demographic-analysis-load-more-btn', 'n_clicks'),
      Input('demographic-metric-dropdown', 'value'),
      Input('date-picker-demographics', 'date'),
      Input('demographic-category-dropdown', 'value')],
-    [Input('demographic-analysis-comment-input', 'value')]
+    [State('demographic-analysis-comment-input', 'value'),
+     State('demographic-analysis-comments-list', 'children'),
+     State('demographic-analysis-comments-cursor', 'data')]
 )
-def handle_demographic_comments(n_clicks, metric, selected_date, category, comment_text):
+def handle_demographic_comments(n_clicks, load_more_clicks, metric, selected_date, category, comment_text, shown_comments, cursor):
     triggered_id = ctx.triggered_id
     status_msg = ""
 
@@ -614,14 +891,17 @@ def handle_demographic_comments(n_clicks, metric, selected_date, category, comme
             category=category
         )
 
-    comments_list = fetch_comments(
+    comments_list, cursor = comments_page(
         chart="Demographic Chart",
+        load_more=triggered_id == "demographic-analysis-load-more-btn",
+        shown=shown_comments,
+        cursor=cursor,
         metric=metric,
         date=selected_date,
         category=category
     )
 
-    return status_msg, comments_list
+    return status_msg, comments_list, cursor
 
 
 # ---------- Trend Chart Callback  ---------- 
@@ -632,40 +912,27 @@ def handle_demographic_comments(n_clicks, metric, selected_date, category, comme
     Input('trend-counties', 'value')
 )
 def update_trend(interval, metric, counties):
-    dfs = []
+    def fetch_one(county=None):
+        try:
+            return fetch_trend(metric, interval, county)
+        except requests.RequestException:
+            return None
 
     # If no county → whole CA in one request
     if not counties:
-        response = requests.get(f"{API_BASE}/summary/trend", params={
-            "metric": metric,
-            "interval": interval
-        })
-        if response.status_code == 200:
-            df = pd.DataFrame(response.json())
-            df["AREA"] = "California"
-            dfs.append(df)
+        dfs = [fetch_one()]
 
     else:
-        # One API call per county
-        for county in counties:
-            response = requests.get(f"{API_BASE}/summary/trend", params={
-                "metric": metric,
-                "interval": interval,
-                "county": county
-            })
-            if response.status_code == 200:
-                df = pd.DataFrame(response.json())
-                df["AREA"] = county
-                dfs.append(df)
+        # One API call per county, issued concurrently so latency is the slowest call, not the sum
+        with ThreadPoolExecutor(max_workers=min(16, len(counties))) as executor:
+            dfs = list(executor.map(fetch_one, counties))
 
+    dfs = [df for df in dfs if df is not None]
     if not dfs:
         return {}
 
     df = pd.concat(dfs, ignore_index=True)
 
-    # Ensure consistent column naming
-    df.rename(columns={f"TOTAL_{metric.upper()}": "VALUE"}, inplace=True)
-
     fig = px.line(
         df,
         x="PERIOD",
@@ -680,19 +947,23 @@ def update_trend(interval, metric, counties):
         margin=dict(l=50, r=30, t=50, b=50)
     )
 
-    return fig
+    return fig.to_dict()
 
 # ---------- Trend Chart Comments Callback  ----------
 @app.callback(
     [Output('trend-comment-status', 'children'),
-     Output('trend-comments-list', 'children')],
+     Output('trend-comments-list', 'children'),
+     Output('trend-comments-cursor', 'data')],
     [Input('trend-submit-btn', 'n_clicks'),
+     Input('trend-load-more-btn', 'n_clicks'),
      Input('trend-metric', 'value'),
      Input('trend-interval', 'value'),
      Input('trend-counties', 'value')],
-    [Input('trend-comment-input', 'value')]
+    [State('trend-comment-input', 'value'),
+     State('trend-comments-list', 'children'),
+     State('trend-comments-cursor', 'data')]
 )
-def handle_trend_comments(n_clicks, metric, interval, counties, comment_text):
+def handle_trend_comments(n_clicks, load_more_clicks, metric, interval, counties, comment_text, shown_comments, cursor):
     triggered_id = ctx.triggered_id
     status_msg = ""
 
@@ -705,34 +976,26 @@ def handle_trend_comments(n_clicks, metric, interval, counties, comment_text):
             counties=counties
         )
 
-    comments_list = fetch_comments(
+    comments_list, cursor = comments_page(
         chart="Trend Chart",
+        load_more=triggered_id == "trend-load-more-btn",
+        shown=shown_comments,
+        cursor=cursor,
         metric=metric,
         interval=interval,
         counties=counties
     )
 
-    return status_msg, comments_list
+    return status_msg, comments_list, cursor
 
 
 # ----------  Callback for Scatterplot  ----------
-@app.callback(
-    Output('cases-vs-deaths-scatter', 'figure'),
-    Input('scatter-date-picker', 'date')
-)
-def update_scatterplot(selected_date):
-    if not selected_date:
-        return {}
-
-    api_url = f"{API_BASE}/cases-demographics-view"
-    params = {"date": selected_date}
-    response = requests.get(api_url, params=params)
-
-    if response.status_code != 200:
-        return {}
-
-    data = response.json()
-    df = pd.DataFrame(data)
+@cache.memoize(timeout=FIGURE_CACHE_TIMEOUT)
+def build_scatter_figure(selected_date_fmt):
+    """
+    Cases vs deaths scatter figure dict for one date (memoized; raises on API errors).
+    """
+    df = fetch_view(selected_date_fmt)
 
     if df.empty:
         return {}
@@ -745,29 +1008,49 @@ def update_scatterplot(selected_date):
         size="TOTAL_TESTS",
         color="AREA",
         hover_name="AREA",
-        size_max=50
+        size_max=50,
+        render_mode="webgl"
     )
 
     # Improve layout
     fig.update_layout(
-        title=f"Cases vs Deaths per 100k (Date: {pd.to_datetime(selected_date).strftime('%Y-%m-%d')})",
+        title=f"Cases vs Deaths per 100k (Date: {selected_date_fmt})",
         xaxis_title="Cases per 100k",
         yaxis_title="Deaths per 100k",
         plot_bgcolor='#ffffff',
         paper_bgcolor='#ffffff'
     )
 
-    return fig
+    return fig.to_dict()
+
+@app.callback(
+    Output('cases-vs-deaths-scatter', 'figure'),
+    Input('scatter-date-picker', 'date')
+)
+def update_scatterplot(selected_date):
+    if not selected_date:
+        return {}
+
+    selected_date_fmt = pd.to_datetime(selected_date).strftime('%Y-%m-%d')
+
+    try:
+        return build_scatter_figure(selected_date_fmt)
+    except requests.RequestException:
+        return {}
 
 # ---------- Scatter Chart Comments Callback  ----------
 @app.callback(
     [Output('correlation-comment-status', 'children'),
-     Output('correlation-comments-list', 'children')],
+     Output('correlation-comments-list', 'children'),
+     Output('correlation-comments-cursor', 'data')],
     [Input('correlation-submit-btn', 'n_clicks'),
+     Input('correlation-load-more-btn', 'n_clicks'),
      Input('scatter-date-picker', 'date')],
-    [Input('correlation-comment-input', 'value')]
+    [State('correlation-comment-input', 'value'),
+     State('correlation-comments-list', 'children'),
+     State('correlation-comments-cursor', 'data')]
 )
-def handle_scatter_comments(n_clicks, selected_date, comment_text):
+def handle_scatter_comments(n_clicks, load_more_clicks, selected_date, comment_text, shown_comments, cursor):
     triggered_id = ctx.triggered_id
     status_msg = ""
 
@@ -778,12 +1061,15 @@ def handle_scatter_comments(n_clicks, selected_date, comment_text):
             date=selected_date
         )
 
-    comments_list = fetch_comments(
+    comments_list, cursor = comments_page(
         chart="Scatter Chart",
+        load_more=triggered_id == "correlation-load-more-btn",
+        shown=shown_comments,
+        cursor=cursor,
         date=selected_date
     )
 
-    return status_msg, comments_list
+    return status_msg, comments_list, cursor
 
 
 if __name__ == '__main__':